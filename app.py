@@ -4,16 +4,36 @@ Deploy on Render: https://render.com
 One endpoint: /suggest - returns replies + corrections
 """
 
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import openai
+from quart import Quart, request, Response
+from quart_cors import cors
+from werkzeug.exceptions import HTTPException
+from quart_rate_limiter import RateLimiter, RateLimit, rate_limit
+from datetime import timedelta
+from cachetools import TTLCache
+from corrections import build_fallback
+import httpx
+import orjson
 import os
+import sys
+import asyncio
 import json
-import re
+import hashlib
+import threading
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Initialize Quart app (async Flask - same API, but handlers run on an
+# event loop so one process can hold hundreds of OpenAI calls in flight)
+app = Quart(__name__)
+app = cors(app)  # Enable CORS for all routes
+
+# Reject oversized bodies at the server layer before any JSON parsing -
+# real payloads are one short sentence, not kilobytes
+app.config['MAX_CONTENT_LENGTH'] = 4096
+
+# Per-IP limits so one client can't burn the whole OpenAI quota
+limiter = RateLimiter(app, default_limits=[
+    RateLimit(60, timedelta(minutes=1)),
+    RateLimit(1000, timedelta(hours=1)),
+])
 
 # ============================================
 # CONFIGURATION
@@ -21,238 +41,149 @@ CORS(app)  # Enable CORS for all routes
 
 # Get API key from environment variable (set in Render dashboard)
 # Important: DO NOT hardcode your key here!
-openai.api_key = os.getenv("OPENAI_API_KEY")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+OPENAI_MODEL = "gpt-4o-mini"  # cheaper + faster than gpt-3.5-turbo, supports JSON mode
+
+# Give up on a slow OpenAI call after this many seconds and retry once.
+# The API's occasional 400s+ tail would otherwise pin a request for minutes;
+# timing out just above typical latency caps P99 at ~2x the usual time.
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "8"))
+
+# All fixed instructions live in one system message that is byte-identical
+# on every call (module constant, so it isn't rebuilt per request either).
+# Only the short user text varies, which lets OpenAI's prompt cache reuse
+# the instruction prefix instead of reprocessing it each time.
+SYSTEM_PROMPT = (
+    "You fix casual English messages and suggest replies. "
+    "Respond as JSON: {display_text, first_reply, all_replies}. "
+    "display_text contains sections 📤 Original / ✅ Corrected / "
+    "💬 Reply Options (3 bullets) / 🔄 Similar Phrases (2 bullets), "
+    "separated by blank lines. all_replies is the array of reply options "
+    "and first_reply is the first of them. Keep it clean and simple."
+)
 
-if not openai.api_key:
+if not OPENAI_API_KEY:
     print("⚠️ WARNING: OPENAI_API_KEY not found in environment variables!")
     print("   Please set it in Render dashboard → Environment tab")
 
+# ONE shared client for the whole process - keep-alive + HTTP/2 means we
+# pay the ~100-300ms TCP/TLS handshake once, not per request. Idle
+# connections are kept warm for a minute so steady traffic never
+# re-handshakes.
+client = httpx.AsyncClient(
+    http2=True,
+    timeout=15.0,
+    limits=httpx.Limits(
+        max_connections=100,
+        max_keepalive_connections=50,
+        keepalive_expiry=60.0,
+    ),
+    headers={"Authorization": f"Bearer {OPENAI_API_KEY}"},
+)
+
+def ojsonify(obj, status=200):
+    """jsonify replacement: orjson encodes 3-10x faster, straight to bytes"""
+    return Response(orjson.dumps(obj), status=status, mimetype="application/json")
+
+# ============================================
+# RESPONSE CACHE
+# ============================================
+
+# Cache successful OpenAI responses for a week, keyed on a hash of the
+# normalized input, so repeat texts ("thanks", "ok", ...) skip the API
+# entirely - no latency, no billing.
+_CACHE = TTLCache(maxsize=2048, ttl=604800)  # 7 days
+_CACHE_LOCK = threading.Lock()
+
+def _normalize(text):
+    """Lowercase + collapse whitespace so trivial variants share a cache entry"""
+    return " ".join(text.lower().split())
+
+def _cache_key(text):
+    return hashlib.sha256(_normalize(text).encode()).hexdigest()
+
+# Coalesce concurrent duplicate requests: if the same normalized text is
+# already being fetched, later callers await the in-flight task instead
+# of spawning their own OpenAI call. Bursts of "ok"/"thanks" from many
+# clients then cost one upstream call, not one each. Single event loop,
+# so plain dict operations are safe without a lock.
+_inflight = {}  # cache_key -> asyncio.Task
+
 # ============================================
 # CORE FUNCTION
 # ============================================
 
-def get_smart_suggestions(user_text):
+async def get_smart_suggestions(user_text):
     """Get ALL suggestions formatted for display"""
-    
-    prompt = f"""TEXT: "{user_text}"
 
-Return a JSON with these EXACT keys:
-1. "display_text": Formatted string with ALL suggestions
-2. "first_reply": First reply option (for auto-copy)
-3. "all_replies": Array of all reply options
+    cache_key = _cache_key(user_text)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(cache_key)
+    if cached is not None:
+        # Return a copy so callers can mutate freely (original_text etc.)
+        return dict(cached)
 
-FORMAT the "display_text" like this example:
-📤 Original: helo cant meet today
+    task = _inflight.get(cache_key)
+    if task is None:
+        # Run the fetch in its own task, detached from any request handler:
+        # Quart cancels handlers when their client disconnects, and the
+        # shared upstream call must survive one caller bailing out. shield()
+        # below keeps that cancellation from reaching the task through the
+        # awaiters too.
+        task = asyncio.create_task(_fetch_suggestions(user_text, cache_key))
+        _inflight[cache_key] = task
+        task.add_done_callback(lambda _task: _inflight.pop(cache_key, None))
+    return dict(await asyncio.shield(task))
 
-✅ Corrected: Hello, can't meet today
+async def _fetch_suggestions(user_text, cache_key):
+    """Do the actual OpenAI call (or fallback) for a cache miss"""
 
-💬 Reply Options:
-• No worries! Maybe tomorrow? 😊
-• Got it, thanks for letting me know!
-• Okay, another time then!
+    try:
+        response = None
+        for attempt in range(2):
+            try:
+                response = await client.post(
+                    OPENAI_CHAT_URL,
+                    json={
+                        "model": OPENAI_MODEL,
+                        "response_format": {"type": "json_object"},
+                        "messages": [
+                            {"role": "system", "content": SYSTEM_PROMPT},
+                            {"role": "user", "content": user_text}
+                        ],
+                        "temperature": 0.5,
+                        "max_tokens": 220
+                    },
+                    timeout=OPENAI_TIMEOUT,
+                )
+                break
+            except (httpx.TimeoutException, httpx.TransportError):
+                if attempt == 1:
+                    raise
+        response.raise_for_status()
 
-🔄 Similar Phrases:
-• Hi, unavailable today
-• Hey, busy today
+        content = response.json()['choices'][0]['message']['content']
 
-Keep it CLEAN and SIMPLE."""
+        # JSON mode guarantees a parseable object - no regex extraction needed
+        result = json.loads(content)
+        # Only cache real API successes - fallbacks should retry next time
+        with _CACHE_LOCK:
+            _CACHE[cache_key] = dict(result)
+        return result
 
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "Return ONLY valid JSON with display_text, first_reply, all_replies keys."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=400
-        )
-        
-        content = response['choices'][0]['message']['content']
-        
-        # Extract JSON
-        import re
-        json_match = re.search(r'\{.*\}', content, re.DOTALL)
-        if json_match:
-            return json.loads(json_match.group())
-        else:
-            return get_fallback_display(user_text)
-            
     except Exception as e:
         print(f"API Error: {e}")
-        return get_fallback_display(user_text)
-
-def get_fallback_display(text):
-    """Simple fallback with everything formatted"""
-    # Basic correction
-    corrected = text
-    fixes = [(" helo ", " hello "), (" cant ", " can't "), (" im ", " I'm ")]
-    for wrong, right in fixes:
-        corrected = corrected.replace(wrong, right)
-    
-    if corrected and len(corrected) > 0:
-        corrected = corrected[0].upper() + corrected[1:]
-    
-    return {
-        "display_text": f"""📤 Original: {text}
-
-✅ Corrected: {corrected}
-
-💬 Reply Options:
-• Thanks! 😊
-• Got it, thanks!
-• Okay, noted!
-
-🔄 Similar Phrases:
-• {corrected}
-• {corrected}!""",
-        "first_reply": "Thanks! 😊",
-        "all_replies": ["Thanks! 😊", "Got it, thanks!", "Okay, noted!"]
-    }
-
-def get_fallback_display(text):
-    """Simple fallback with everything formatted"""
-    # Basic correction
-    corrected = text
-    fixes = [(" helo ", " hello "), (" cant ", " can't "), (" im ", " I'm ")]
-    for wrong, right in fixes:
-        corrected = corrected.replace(wrong, right)
-    
-    if corrected and len(corrected) > 0:
-        corrected = corrected[0].upper() + corrected[1:]
-    
-    return {
-        "display_text": f"""📤 Original: {text}
-
-✅ Corrected: {corrected}
-
-💬 Reply Options:
-• Thanks! 😊
-• Got it, thanks!
-• Okay, noted!
-
-🔄 Similar Phrases:
-• {corrected}
-• {corrected}!""",
-        "first_reply": "Thanks! 😊",
-        "all_replies": ["Thanks! 😊", "Got it, thanks!", "Okay, noted!"]
-    }
-
-def get_fallback_response(text):
-    """Fallback response when OpenAI fails"""
-    # Simple text cleaning
-    cleaned = text
-    fixes = [
-        (" helo ", " hello "),
-        (" im ", " I'm "),
-        (" cant ", " can't "),
-        (" dont ", " don't "),
-        (" wont ", " won't "),
-        (" ur ", " your "),
-        (" u ", " you "),
-        (" pls ", " please "),
-        (" thx ", " thanks ")
-    ]
-    
-    for wrong, right in fixes:
-        cleaned = cleaned.replace(wrong, right)
-    
-    # Capitalize first letter
-    if cleaned and len(cleaned) > 0:
-        cleaned = cleaned[0].upper() + cleaned[1:]
-    
-    return {
-        "suggested_replies": [
-            "Thanks! 😊",
-            "Got it, thanks!",
-            "Okay, noted!"
-        ],
-        "corrected_text": cleaned,
-        "similar_phrases": [
-            cleaned,
-            cleaned + "!",
-            "Hey, " + cleaned.lower()
-        ]
-    }
+        return build_fallback(user_text)
 
 # ============================================
-# API ENDPOINTS
+# STATIC PAYLOADS
 # ============================================
 
-@app.route('/suggest', methods=['POST'])
-def suggest():
-    """ONE simple endpoint returning EVERYTHING formatted"""
-    try:
-        data = request.get_json()
-        user_text = data.get('text', '').strip()
-        
-        if not user_text:
-            return jsonify({"error": "No text provided"}), 400
-        
-        # Get everything in ONE call
-        result = get_smart_suggestions(user_text)
-        
-        # Add original text
-        result['original_text'] = user_text
-        result['success'] = True
-        
-        return jsonify(result)
-        
-    except Exception as e:
-        return jsonify({
-            "error": str(e),
-            "display_text": f"❌ Error: {e}",
-            "first_reply": "Error occurred",
-            "all_replies": ["Try again"]
-        }), 500
-
-@app.route('/health', methods=['GET'])
-def health():
-    """Health check endpoint (for monitoring)"""
-    status = "healthy" if openai.api_key else "warning_no_key"
-    
-    return jsonify({
-        "status": status,
-        "service": "English Assistant API",
-        "version": "1.0",
-        "openai_configured": bool(openai.api_key),
-        "endpoints": {
-            "POST /suggest": "Get replies + corrections",
-            "GET /health": "This health check",
-            "GET /test": "Example response"
-        },
-        "usage": "Send POST to /suggest with {'text': 'your message'}"
-    })
-
-@app.route('/test', methods=['GET'])
-def test():
-    """Test endpoint with example response"""
-    example_text = "helo cant meet today sorry"
-    
-    # Generate example without calling OpenAI
-    example_response = {
-        "original_text": example_text,
-        "corrected_text": "Hello, can't meet today, sorry.",
-        "suggested_replies": [
-            "No worries! Maybe tomorrow? 😊",
-            "Got it, thanks for letting me know!",
-            "Okay, another time then!"
-        ],
-        "similar_phrases": [
-            "Hi, unavailable today",
-            "Hey, busy today"
-        ],
-        "success": True,
-        "characters_processed": len(example_text),
-        "note": "This is a static example. Real API calls will vary."
-    }
-    
-    return jsonify(example_response)
-
-@app.route('/', methods=['GET'])
-def home():
-    """Home page with instructions"""
-    return """
+# The home page and the /test example never change, and monitors hit
+# them constantly - build each once at import and serve the same bytes
+# with a long Cache-Control so edges/CDNs can cache them too.
+_HOME_HTML = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -267,7 +198,7 @@ def home():
     <body>
         <h1>📱 English Assistant API</h1>
         <p>Server is running! Use the endpoints below:</p>
-        
+
         <div class="endpoint">
             <h3>📤 Main Endpoint</h3>
             <p><code>POST /suggest</code> - Get replies + corrections</p>
@@ -282,54 +213,199 @@ def home():
                 <li>Similar alternative phrases</li>
             </ul>
         </div>
-        
+
         <div class="endpoint">
             <h3>📊 Other Endpoints</h3>
             <p><code>GET /health</code> - Server status</p>
             <p><code>GET /test</code> - Example response</p>
         </div>
-        
+
         <p>📱 <strong>For iPhone Shortcut:</strong> Use URL: <code>https://[your-app].onrender.com/suggest</code></p>
     </body>
     </html>
     """
 
+_TEST_EXAMPLE_TEXT = "helo cant meet today sorry"
+_TEST_JSON = json.dumps({
+    "original_text": _TEST_EXAMPLE_TEXT,
+    "corrected_text": "Hello, can't meet today, sorry.",
+    "suggested_replies": [
+        "No worries! Maybe tomorrow? 😊",
+        "Got it, thanks for letting me know!",
+        "Okay, another time then!"
+    ],
+    "similar_phrases": [
+        "Hi, unavailable today",
+        "Hey, busy today"
+    ],
+    "success": True,
+    "characters_processed": len(_TEST_EXAMPLE_TEXT),
+    "note": "This is a static example. Real API calls will vary."
+}).encode()
+
+_STATIC_CACHE_HEADERS = {"Cache-Control": "public, max-age=3600"}
+
+# ============================================
+# API ENDPOINTS
+# ============================================
+
+@app.route('/suggest', methods=['POST'])
+@rate_limit(20, timedelta(minutes=1))
+async def suggest():
+    """ONE simple endpoint returning EVERYTHING formatted"""
+    try:
+        # orjson + raw body: skips get_json's content-type sniffing and
+        # the slower stdlib decoder for this tiny payload
+        try:
+            data = orjson.loads(await request.get_data(cache=False) or b"{}")
+        except orjson.JSONDecodeError:
+            return ojsonify({"error": "bad json"}, 400)
+        user_text = (data.get('text') or '').strip()
+
+        if not user_text:
+            return ojsonify({"error": "No text provided"}, 400)
+
+        # Get everything in ONE call
+        result = await get_smart_suggestions(user_text)
+
+        # Add original text
+        result['original_text'] = user_text
+        result['success'] = True
+
+        return ojsonify(result)
+
+    except HTTPException:
+        # Let MAX_CONTENT_LENGTH (413) and friends keep their real status
+        # instead of being wrapped into a retryable-looking 500
+        raise
+    except Exception as e:
+        return ojsonify({
+            "error": str(e),
+            "display_text": f"❌ Error: {e}",
+            "first_reply": "Error occurred",
+            "all_replies": ["Try again"]
+        }, 500)
+
+@app.route('/suggest/stream', methods=['POST'])
+@rate_limit(20, timedelta(minutes=1))
+async def suggest_stream():
+    """Streaming version of /suggest - forwards tokens as Server-Sent Events
+
+    First token arrives in ~300-500ms instead of waiting for the whole
+    completion, so clients can render suggestions as they're generated.
+    The original /suggest stays unchanged for clients that want one JSON blob.
+    """
+    try:
+        data = orjson.loads(await request.get_data(cache=False) or b"{}")
+    except HTTPException:
+        # Oversized bodies surface as a proper 413, same as /suggest
+        raise
+    except orjson.JSONDecodeError:
+        return ojsonify({"error": "bad json"}, 400)
+    user_text = (data.get('text') or '').strip()
+
+    if not user_text:
+        return ojsonify({"error": "No text provided"}, 400)
+
+    async def generate():
+        try:
+            async with client.stream(
+                "POST",
+                OPENAI_CHAT_URL,
+                json={
+                    "model": OPENAI_MODEL,
+                    "response_format": {"type": "json_object"},
+                    "messages": [
+                        {"role": "system", "content": SYSTEM_PROMPT},
+                        {"role": "user", "content": user_text}
+                    ],
+                    "temperature": 0.5,
+                    "max_tokens": 220,
+                    "stream": True
+                },
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    payload = line[len("data: "):]
+                    if payload == "[DONE]":
+                        break
+                    delta = json.loads(payload)['choices'][0]['delta']
+                    if delta:
+                        yield f"data: {json.dumps(delta)}\n\n"
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            print(f"API Error: {e}")
+            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+
+    return Response(generate(), mimetype='text/event-stream')
+
+@app.route('/health', methods=['GET'])
+async def health():
+    """Health check endpoint (for monitoring)"""
+    status = "healthy" if OPENAI_API_KEY else "warning_no_key"
+
+    return ojsonify({
+        "status": status,
+        "service": "English Assistant API",
+        "version": "1.0",
+        "openai_configured": bool(OPENAI_API_KEY),
+        "endpoints": {
+            "POST /suggest": "Get replies + corrections",
+            "GET /health": "This health check",
+            "GET /test": "Example response"
+        },
+        "usage": "Send POST to /suggest with {'text': 'your message'}"
+    })
+
+@app.route('/test', methods=['GET'])
+async def test():
+    """Test endpoint with example response"""
+    return Response(_TEST_JSON, mimetype="application/json", headers=_STATIC_CACHE_HEADERS)
+
+@app.route('/', methods=['GET'])
+async def home():
+    """Home page with instructions"""
+    return Response(_HOME_HTML, mimetype="text/html", headers=_STATIC_CACHE_HEADERS)
+
 # ============================================
 # SERVER STARTUP
 # ============================================
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 10000))  # Render uses port 10000
-    
-    print("\n" + "="*60)
-    print("🚀 ENGLISH ASSISTANT API - RENDER DEPLOYMENT")
-    print("="*60)
-    print(f"📡 Server starting on port {port}")
-    print(f"🔗 Local: http://localhost:{port}")
-    print(f"🔗 Health: http://localhost:{port}/health")
-    
-    # Check OpenAI configuration
-    if openai.api_key:
-        print(f"✅ OpenAI: CONFIGURED")
-        # Test key with a simple call
-        try:
-            test_response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=5
-            )
-            print(f"✅ OpenAI: KEY VALID (test successful)")
-        except Exception as e:
-            print(f"⚠️ OpenAI: KEY INVALID ({str(e)[:50]}...)")
-    else:
-        print(f"❌ OpenAI: NOT CONFIGURED - Set OPENAI_API_KEY in Render")
-    
-    print("\n📚 Endpoints:")
-    print(f"   POST http://localhost:{port}/suggest  (main endpoint)")
-    print(f"   GET  http://localhost:{port}/health   (status check)")
-    print(f"   GET  http://localhost:{port}/test     (example)")
-    print("="*60 + "\n")
-    
-    # Start the server
+
+    # One buffered write instead of ~15 prints (each flushes line-buffered
+    # stdout), and only when asked - production boots silent and fast.
+    # No OpenAI test call here either: a slow API tail would stall boot
+    # past Render's health-check window; the first real /suggest request
+    # surfaces auth errors through the existing handlers.
+    if os.getenv("VERBOSE_STARTUP"):
+        openai_status = (
+            "✅ OpenAI: CONFIGURED" if OPENAI_API_KEY
+            else "❌ OpenAI: NOT CONFIGURED - Set OPENAI_API_KEY in Render"
+        )
+        _BANNER = "\n".join([
+            "",
+            "=" * 60,
+            "🚀 ENGLISH ASSISTANT API - RENDER DEPLOYMENT",
+            "=" * 60,
+            f"📡 Server starting on port {port}",
+            f"🔗 Local: http://localhost:{port}",
+            f"🔗 Health: http://localhost:{port}/health",
+            openai_status,
+            "",
+            "📚 Endpoints:",
+            f"   POST http://localhost:{port}/suggest  (main endpoint)",
+            f"   GET  http://localhost:{port}/health   (status check)",
+            f"   GET  http://localhost:{port}/test     (example)",
+            "=" * 60,
+            "",
+        ])
+        sys.stdout.write(_BANNER + "\n")
+        sys.stdout.flush()
+
+    # Start the server (local dev only - Render runs hypercorn, see README)
     # Note: debug=False for production
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,62 @@
+"""
+Text corrections + no-API fallback for the English Assistant API
+
+Single source of truth for the shorthand/typo fixes and the canned
+fallback response. app.py previously carried several diverging copies
+of these helpers; everything lives here now so the fixes dict and its
+compiled pattern exist exactly once per process.
+"""
+
+import re
+
+# Common shorthand/typo corrections for the no-API fallback path.
+# Compiled into one alternation so the text is scanned once in C instead
+# of one full str.replace pass (and one new string) per entry.
+_FIXES = {
+    "helo": "hello",
+    "im": "I'm",
+    "cant": "can't",
+    "dont": "don't",
+    "wont": "won't",
+    "ur": "your",
+    "u": "you",
+    "pls": "please",
+    "thx": "thanks",
+}
+_FIX_RE = re.compile(
+    r" (" + "|".join(re.escape(k) for k in sorted(_FIXES, key=len, reverse=True)) + r")(?= )"
+)
+
+# Allocated once - every fallback response reuses the same tuple
+_FALLBACK_REPLIES = ("Thanks! 😊", "Got it, thanks!", "Okay, noted!")
+
+def apply_fixes(text):
+    """Fix common shorthand/typos in a single regex pass"""
+    # Pad so fixes also apply at the very start/end of the text; the
+    # lookahead keeps the trailing space available for the next match
+    padded = _FIX_RE.sub(lambda m: " " + _FIXES[m.group(1)], " " + text + " ")
+    return padded.strip()
+
+def build_fallback(text):
+    """Canned display response for when OpenAI fails"""
+    corrected = apply_fixes(text)
+
+    if corrected:
+        corrected = corrected[0].upper() + corrected[1:]
+
+    return {
+        "display_text": f"""📤 Original: {text}
+
+✅ Corrected: {corrected}
+
+💬 Reply Options:
+• {_FALLBACK_REPLIES[0]}
+• {_FALLBACK_REPLIES[1]}
+• {_FALLBACK_REPLIES[2]}
+
+🔄 Similar Phrases:
+• {corrected}
+• {corrected}!""",
+        "first_reply": _FALLBACK_REPLIES[0],
+        "all_replies": list(_FALLBACK_REPLIES)
+    }